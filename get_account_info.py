@@ -1,25 +1,353 @@
 """
 Get Account Information from Lighter.xyz
-Shows: Account Index, Balance, Positions
+Shows: Account Index, Balance, Positions, Open Orders, Recent Fills
+(ทุก market และทุก sub-account - ดึงข้อมูลแบบขนาน)
+
+Usage:
+    python3 get_account_info.py                  # ตารางสรุป
+    python3 get_account_info.py --json           # JSON สำหรับ script/ops
+    python3 get_account_info.py --watch 5        # refresh ทุก 5 วินาที
+    python3 get_account_info.py --markets 0,1,2  # เฉพาะบาง market
+
+ทุก request ผ่าน token bucket (60 requests / 60 วินาที ตาม rate limit ของ Lighter)
+Open orders ถูกดึงเฉพาะ market ที่ account มี open_order_count > 0 ถ้า API ไม่ส่ง field นี้
+จะต้อง query ทุก market (1 request ต่อ market) - ควรใช้ --markets เมื่อมี market จำนวนมาก
+Open orders / fills ดึงได้เฉพาะ ACCOUNT_INDEX ใน .env (auth token ผูกกับ API key นั้น)
+Fills: ไม่ระบุ --markets = 1 request (--fills ล่าสุดทุก market), ระบุ --markets = 1 request ต่อ market
+Error (นอก --watch) ออก stderr หรือ JSON {"error": ...} เมื่อใช้ --json และ exit status = 1
 """
+import argparse
 import asyncio
+import json
 import os
+import sys
+import time
 from dotenv import load_dotenv
 import lighter
+import requests
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
 
-async def get_account_info():
+# จำนวน request พร้อมกันสูงสุด (ขนาด connection pool)
+MAX_CONCURRENT_REQUESTS = 8
+
+# Lighter rate limit: 60 requests / 60 วินาที
+RATE_LIMIT_REQUESTS = 60
+RATE_LIMIT_WINDOW = 60
+
+
+def create_session(pool_size=MAX_CONCURRENT_REQUESTS):
+    """สร้าง requests.Session ที่ใช้ connection pool ร่วมกันทุก request"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RateLimiter:
+    """Token bucket: ไม่เกิน `max_requests` ครั้ง ต่อ `window` วินาที"""
+
+    def __init__(self, max_requests=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW):
+        self.capacity = max_requests
+        self.rate = max_requests / window  # tokens ต่อวินาที
+        self.tokens = float(max_requests)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """รอจนมี token ว่าง แล้วใช้ 1 token"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AccountInspector:
+    def __init__(self, client, session, base_url, account_index, market_ids=None, fills_limit=20,
+                 rate_limiter=None):
+        self.client = client
+        self.session = session
+        self.base_url = base_url
+        self.account_index = account_index  # account ของ API key ใน .env (ใช้ auth ได้เฉพาะ account นี้)
+        self.market_ids = market_ids  # None = ทุก market
+        self.fills_limit = fills_limit
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.auth_token = None  # สร้างใหม่ครั้งเดียวต่อ snapshot
+        self.markets = None  # cache {market_id: symbol} ข้าม watch iterations
+        self.sub_accounts = None  # cache account indexes ใต้ L1 address เดียวกัน
+
+    async def get_json(self, path, params=None, expect=None, auth=False):
+        """
+        GET แบบ async (รัน requests ใน thread) ผ่าน rate limiter และ connection pool
+        raise เมื่อ HTTP error, API ตอบ code != 200 หรือไม่มี key `expect` ใน response
+        """
+        headers = {"Authorization": self.auth_token} if auth else {}
+
+        await self.rate_limiter.acquire()
+        async with self.semaphore:
+            response = await asyncio.to_thread(
+                self.session.get, f"{self.base_url}{path}",
+                params=params, headers=headers, timeout=10
+            )
+        response.raise_for_status()
+        data = response.json()
+
+        if data.get('code', 200) != 200:
+            raise Exception(f"API error {data.get('code')}: {data.get('message', '')}")
+        if expect is not None and expect not in data:
+            raise Exception(f"Unexpected response from {path}: missing '{expect}'")
+        return data
+
+    async def refresh_auth_token(self):
+        """สร้าง auth token ครั้งเดียวต่อ snapshot (signing รันใน thread)"""
+        auth_token, err = await asyncio.to_thread(self.client.create_auth_token_with_expiry)
+        if err:
+            raise Exception(f"Auth error: {err}")
+        self.auth_token = auth_token
+
+    async def get_markets(self):
+        """ดึงรายชื่อ market ทั้งหมด -> {market_id: symbol} (cache หลังโหลดสำเร็จ)"""
+        if self.markets is None:
+            data = await self.get_json("/api/v1/orderBooks", expect='order_books')
+            markets = {
+                book['market_id']: book.get('symbol', f"Market{book['market_id']}")
+                for book in data['order_books']
+            }
+            if self.market_ids is not None:
+                markets = {m: s for m, s in markets.items() if m in self.market_ids}
+            self.markets = markets
+        return self.markets
+
+    async def get_account(self, account_index):
+        """ดึงข้อมูล account (balance + positions)"""
+        data = await self.get_json("/api/v1/account", {"by": "index", "value": account_index}, expect='accounts')
+        if not data['accounts']:
+            raise Exception(f"Account {account_index} not found")
+        return data['accounts'][0]
+
+    async def get_sub_accounts(self, l1_address):
+        """ดึง account index ทั้งหมดที่อยู่ใต้ L1 address เดียวกัน (cache หลังโหลดสำเร็จ)"""
+        if self.sub_accounts is None:
+            if not l1_address:
+                return [self.account_index]
+            data = await self.get_json("/api/v1/accountsByL1Address", {"l1_address": l1_address},
+                                       expect='sub_accounts')
+            indexes = [sub['index'] for sub in data['sub_accounts']]
+            if self.account_index not in indexes:
+                indexes.insert(0, self.account_index)
+            self.sub_accounts = indexes
+        return self.sub_accounts
+
+    async def get_active_orders(self, account_index, market_id):
+        """ดู orders ที่ active ของ market หนึ่ง"""
+        data = await self.get_json(
+            "/api/v1/accountActiveOrders",
+            {"account_index": account_index, "market_id": market_id},
+            expect='orders', auth=True
+        )
+        return data['orders']
+
+    async def get_recent_fills(self, account_index, market_id=None):
+        """ดู fills ล่าสุดของ account (market_id=None = ทุก market ใน request เดียว)"""
+        params = {"account_index": account_index, "sort_by": "timestamp", "limit": self.fills_limit}
+        if market_id is not None:
+            params["market_id"] = market_id
+        data = await self.get_json("/api/v1/trades", params, expect='trades', auth=True)
+        return data['trades']
+
+    @staticmethod
+    def order_markets(account_data, markets):
+        """
+        market ที่ต้องดึง open orders: ใช้ open_order_count ใน positions ของ account
+        ไม่มี positions = ไม่มี market ที่ต้อง query
+        ถ้ามี positions แต่ API ไม่ส่ง field นี้มา ต้อง query ทุก market (ควรใช้ --markets)
+        """
+        positions = account_data.get('positions', [])
+        if all('open_order_count' in p for p in positions):
+            return [
+                p['market_id'] for p in positions
+                if p['market_id'] in markets and int(p['open_order_count'] or 0) > 0
+            ]
+        return list(markets)
+
+    async def inspect_account(self, account_index, markets, account_data):
+        """ดึง open orders และ fills ของ account เดียวแบบขนาน"""
+        errors = []
+        notes = []
+        orders = []
+        fills = []
+
+        if isinstance(account_data, Exception):
+            errors.append(f"account: {account_data}")
+            account_data = {}
+        elif account_index != self.account_index:
+            # auth token เป็นของ API key ใน .env ใช้กับ sub-account อื่นไม่ได้
+            notes.append(f"no API key for account {account_index} - open orders / fills skipped")
+        else:
+            market_ids = self.order_markets(account_data, markets)
+            # --markets: ดึง fills แยกต่อ market ที่เลือก (limit ต่อ market) ไม่ใช่กรองทีหลัง
+            fill_markets = sorted(markets) if self.market_ids is not None else [None]
+            results = await asyncio.gather(
+                *[self.get_recent_fills(account_index, m) for m in fill_markets],
+                *[self.get_active_orders(account_index, m) for m in market_ids],
+                return_exceptions=True
+            )
+            fill_results, order_results = results[:len(fill_markets)], results[len(fill_markets):]
+
+            for market_id, result in zip(fill_markets, fill_results):
+                if isinstance(result, Exception):
+                    label = "fills" if market_id is None else f"fills[{markets[market_id]}]"
+                    errors.append(f"{label}: {result}")
+                else:
+                    fills.extend(result)
+
+            for market_id, result in zip(market_ids, order_results):
+                if isinstance(result, Exception):
+                    errors.append(f"orders[{markets[market_id]}]: {result}")
+                else:
+                    orders.extend(result)
+
+        positions = [
+            p for p in account_data.get('positions', [])
+            if float(p.get('position', 0) or 0) != 0 and p.get('market_id') in markets
+        ]
+        fills = [f for f in fills if f.get('market_id') in markets]
+
+        return {
+            'account_index': account_index,
+            'collateral': account_data.get('collateral'),
+            'available_balance': account_data.get('available_balance'),
+            'total_asset_value': account_data.get('total_asset_value'),
+            'positions': positions,
+            'open_orders': orders,
+            'recent_fills': fills,
+            'errors': errors,
+            'notes': notes,
+        }
+
+    async def snapshot(self):
+        """ดึงข้อมูลทุก sub-account และทุก market พร้อมกัน"""
+        started = time.perf_counter()
+
+        markets, main_account, _ = await asyncio.gather(
+            self.get_markets(),
+            self.get_account(self.account_index),
+            self.refresh_auth_token()
+        )
+        sub_accounts = await self.get_sub_accounts(main_account.get('l1_address'))
+
+        # ดึง account data ของ sub-account อื่น (main account ดึงไว้แล้ว)
+        others = [i for i in sub_accounts if i != self.account_index]
+        other_data = await asyncio.gather(*[self.get_account(i) for i in others], return_exceptions=True)
+        account_data = {self.account_index: main_account, **dict(zip(others, other_data))}
+
+        accounts = await asyncio.gather(*[
+            self.inspect_account(index, markets, data) for index, data in account_data.items()
+        ])
+
+        return {
+            'timestamp': int(time.time()),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000),
+            'markets': {str(m): s for m, s in markets.items()},
+            'accounts': accounts,
+        }
+
+
+def print_table(snapshot):
+    """แสดง snapshot เป็นตาราง"""
+    markets = snapshot['markets']
+
+    def symbol(market_id):
+        return markets.get(str(market_id), f"Market{market_id}")
+
+    print("=" * 60)
+    print("🔍 Lighter Account Information")
+    print("=" * 60)
+    print(f"Markets: {len(markets)} | Accounts: {len(snapshot['accounts'])} | "
+          f"Fetched in {snapshot['elapsed_ms']} ms")
+
+    for account in snapshot['accounts']:
+        print(f"\n📋 Account {account['account_index']}")
+        print(f"   Collateral: ${account['collateral']} | Available: ${account['available_balance']} | "
+              f"Total Value: ${account['total_asset_value']}")
+
+        print(f"\n   📊 Positions ({len(account['positions'])}):")
+        if account['positions']:
+            print(f"   {'Market':<10} {'Side':<6} {'Size':>14} {'Entry':>14} {'uPnL':>12}")
+            for p in account['positions']:
+                side = "LONG" if int(p.get('sign', 1)) > 0 else "SHORT"
+                print(f"   {symbol(p.get('market_id')):<10} {side:<6} {p.get('position', ''):>14} "
+                      f"{p.get('avg_entry_price', ''):>14} {p.get('unrealized_pnl', ''):>12}")
+
+        print(f"\n   📝 Open Orders ({len(account['open_orders'])}):")
+        if account['open_orders']:
+            print(f"   {'Market':<10} {'Side':<6} {'Price':>14} {'Remaining':>14}")
+            for o in account['open_orders']:
+                side = "SELL" if o.get('is_ask') else "BUY"
+                print(f"   {symbol(o.get('market_index')):<10} {side:<6} {o.get('price', ''):>14} "
+                      f"{o.get('remaining_base_amount', ''):>14}")
+
+        print(f"\n   💰 Recent Fills ({len(account['recent_fills'])}):")
+        if account['recent_fills']:
+            print(f"   {'Market':<10} {'Side':<6} {'Price':>14} {'Size':>14} {'USD':>12}")
+            for f in account['recent_fills']:
+                side = "SELL" if f.get('ask_account_id') == account['account_index'] else "BUY"
+                print(f"   {symbol(f.get('market_id')):<10} {side:<6} {f.get('price', ''):>14} "
+                      f"{f.get('size', ''):>14} {f.get('usd_amount', ''):>12}")
+
+        for note in account['notes']:
+            print(f"   ℹ️  {note}")
+        for err in account['errors']:
+            print(f"   ⚠️  {err}")
+
+    print("\n" + "=" * 60)
+
+
+def parse_market_ids(value):
+    """--markets: market ids คั่นด้วย comma -> set ของ int"""
+    try:
+        market_ids = {int(m) for m in value.split(',') if m.strip()}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid market ids: {value!r} (expected e.g. 0,1,2)")
+    if not market_ids:
+        raise argparse.ArgumentTypeError("no market ids given")
+    return market_ids
+
+
+def report_error(message, as_json):
+    """แสดง error: JSON object บน stdout เมื่อ --json, ไม่งั้นเป็นข้อความบน stderr"""
+    if as_json:
+        print(json.dumps({'error': message, 'timestamp': int(time.time())}))
+    else:
+        print(f"❌ {message}", file=sys.stderr)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inspect Lighter account: balances, positions, orders, fills")
+    parser.add_argument('--json', action='store_true', help="แสดงผลเป็น JSON")
+    parser.add_argument('--watch', type=float, metavar='SECONDS', help="refresh ทุก N วินาที")
+    parser.add_argument('--markets', type=parse_market_ids,
+                        help="market ids คั่นด้วย comma (default: ทุก market)")
+    parser.add_argument('--fills', type=int, default=20, help="จำนวน fills ล่าสุดต่อ account (default: 20)")
+    return parser.parse_args()
+
+
+async def get_account_info(args):
+    """คืน exit status: 0 = สำเร็จ, 1 = error"""
     # Load credentials
     api_key_pk = os.getenv('API_KEY_PRIVATE_KEY')
     account_index = int(os.getenv('ACCOUNT_INDEX', 0))
     api_key_index = int(os.getenv('API_KEY_INDEX', 0))
     base_url = os.getenv('BASE_URL')
 
-    print("=" * 60)
-    print("🔍 Lighter Account Information")
-    print("=" * 60)
-
     # Connect to Lighter
     client = lighter.SignerClient(
         url=base_url,
@@ -30,23 +358,48 @@ async def get_account_info():
 
     err = client.check_client()
     if err:
-        print(f"❌ Connection error: {err}")
-        return
+        report_error(f"Connection error: {err}", args.json)
+        await client.close()
+        return 1
 
-    print(f"✅ Connected to Lighter\n")
+    session = create_session()
+    inspector = AccountInspector(client, session, base_url, account_index, args.markets, args.fills)
+    status = 0
 
-    # Display account info
-    print(f"📋 Account Details:")
-    print(f"   ACCOUNT_INDEX: {account_index}")
-    print(f"   API_KEY_INDEX: {api_key_index}")
-    print(f"   Base URL: {base_url}")
+    try:
+        while True:
+            try:
+                snapshot = await inspector.snapshot()
+            except Exception as e:
+                report_error(f"Snapshot error: {e}", args.json)
+                if not args.watch:
+                    status = 1
+                    break
+                # watch mode: แสดง error แล้ว refresh รอบถัดไปต่อ
+                await asyncio.sleep(args.watch)
+                continue
 
-    print("\n" + "=" * 60)
-    print("✅ Copy this value to your .env file:")
-    print(f"\n   ACCOUNT_INDEX={account_index}")
-    print("\n" + "=" * 60)
+            if args.json:
+                print(json.dumps(snapshot, indent=2))
+            else:
+                if args.watch:
+                    print("\033[2J\033[H", end="")  # clear screen
+                print_table(snapshot)
+
+            if not args.watch:
+                break
+            await asyncio.sleep(args.watch)
+
+    except KeyboardInterrupt:
+        pass
+    finally:
+        session.close()
+        await client.close()
 
-    await client.close()
+    return status
 
 if __name__ == "__main__":
-    asyncio.run(get_account_info())
+    try:
+        sys.exit(asyncio.run(get_account_info(parse_args())))
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
@@ -0,0 +1,175 @@
+"""
+Grid construction for Lighter Grid Trading Bot
+คำนวณ grid levels, integer tick prices และ order sizes ใน vectorized pass เดียว (numpy)
+Spacing: arithmetic, geometric, volatility (ตาม volatility ล่าสุด)
+Sizing: uniform, linear, exponential หรือ weights ที่กำหนดเอง
+"""
+import numpy as np
+
+SPACINGS = ('arithmetic', 'geometric', 'volatility')
+SIZINGS = ('uniform', 'linear', 'exponential')
+
+
+def recent_volatility(prices):
+    """Standard deviation ของ log returns จากราคาล่าสุด (เช่น close ของ candles)"""
+    prices = np.asarray(prices, dtype=np.float64)
+    prices = prices[prices > 0]
+    if prices.size < 3:
+        return 0.0
+    return float(np.std(np.diff(np.log(prices)), ddof=1))
+
+
+def grid_prices(current_price, lower_price, upper_price, grid_count,
+                spacing='arithmetic', volatility=0.0, vol_multiplier=1.0, min_step=0.0):
+    """
+    คำนวณ grid levels (float) ระหว่าง lower_price - upper_price
+    - arithmetic: ห่างเท่ากันเป็น $
+    - geometric: ห่างเท่ากันเป็น %
+    - volatility: ห่างเท่ากันทีละ vol_multiplier * volatility (log returns) รอบ current_price
+      ฝั่งบน/ล่างแบ่งจำนวน level ตามสัดส่วนของ range (LONG/SHORT bias) และไม่เกิน range
+      step ไม่ต่ำกว่า min_step (log ของ 1 tick)
+    """
+    if grid_count < 2:
+        raise ValueError(f"grid_count must be >= 2, got {grid_count}")
+
+    if spacing == 'arithmetic':
+        return np.linspace(lower_price, upper_price, grid_count)
+
+    if spacing == 'geometric':
+        return np.geomspace(lower_price, upper_price, grid_count)
+
+    if spacing == 'volatility':
+        down = np.log(current_price / lower_price)
+        up = np.log(upper_price / current_price)
+
+        n_down = int(round(grid_count * down / (down + up)))
+        n_down = min(max(n_down, 1), grid_count - 1)
+        n_up = grid_count - n_down
+
+        # ไม่มีข้อมูล volatility -> เต็ม range แต่ละฝั่งพอดี (geometric แยกฝั่งบน/ล่าง)
+        step = vol_multiplier * volatility
+        if not step > 0:
+            step = np.inf
+        step = max(step, min_step)
+        # แต่ละฝั่งไม่เกิน range ของตัวเอง (level นอกสุดอยู่ที่ขอบ range พอดี ไม่ซ้อนกัน)
+        step_down = min(step, down / n_down)
+        step_up = min(step, up / n_up)
+
+        # ไม่วาง level ที่ราคาตลาดพอดี
+        offsets = np.concatenate((
+            -step_down * np.arange(n_down, 0, -1, dtype=np.float64),
+            step_up * np.arange(1, n_up + 1, dtype=np.float64),
+        ))
+        return current_price * np.exp(offsets)
+
+    raise ValueError(f"Unknown grid spacing: {spacing} (use one of {', '.join(SPACINGS)})")
+
+
+def size_weights(distances, sizing='uniform', skew=1.0):
+    """
+    น้ำหนักของขนาด order ต่อ level (รวมกัน = 1)
+    - uniform: เท่ากันทุก level
+    - linear: ใหญ่ขึ้นตามระยะห่างจากราคาตลาด (ไกลสุด = 1 + skew เท่า)
+    - exponential: ใหญ่ขึ้นแบบ exp(skew * ระยะห่าง normalized)
+    - array/list: กำหนด weight เองทีละ level (เรียงจากราคาต่ำไปสูง)
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+
+    if isinstance(sizing, str):
+        max_distance = distances.max() if distances.size else 0.0
+        normalized = distances / max_distance if max_distance > 0 else np.zeros_like(distances)
+
+        if sizing == 'uniform':
+            weights = np.ones_like(distances)
+        elif sizing == 'linear':
+            weights = 1.0 + skew * normalized
+        elif sizing == 'exponential':
+            weights = np.exp(skew * normalized)
+        else:
+            raise ValueError(f"Unknown grid sizing: {sizing} (use one of {', '.join(SIZINGS)})")
+    else:
+        weights = np.asarray(sizing, dtype=np.float64)
+        if weights.shape != distances.shape or np.any(weights < 0) or weights.sum() <= 0:
+            raise ValueError("Custom sizing weights must be non-negative, one per level")
+
+    return weights / weights.sum()
+
+
+def build_grid(current_price, lower_price, upper_price, grid_count, notional,
+               price_decimals=1, size_decimals=8, spacing='arithmetic', sizing='uniform',
+               skew=1.0, volatility=0.0, vol_multiplier=1.0, min_base_amount=0.0, min_quote_amount=0.0):
+    """
+    สร้าง grid ทั้งหมดใน vectorized pass เดียว
+
+    Returns dict ของ numpy arrays (เรียงจาก level ใกล้ราคาตลาดที่สุดก่อน):
+        prices:       ราคา float ที่ตรง tick พอดี (= price_ints / 10**price_decimals)
+        price_ints:   ราคา integer สำหรับ create_order
+        base_amounts: ขนาด order integer (size_decimals) สำหรับ create_order
+        is_ask:       True = SELL (ราคาสูงกว่าราคาตลาด)
+    และ int:
+        merged:       จำนวน level ที่ถูกรวมเพราะตก tick เดียวกัน (หรือตรงราคาตลาดพอดี)
+        dropped:      จำนวน level ที่ถูกตัดเพราะ notional ไม่พอให้ทุก level ถึงขนาดขั้นต่ำ
+
+    levels ที่ตก tick เดียวกันจะถูกรวมเป็น level เดียว
+    ถ้า notional ไม่พอให้ทุก level ถึง min_base_amount (coin) / min_quote_amount (USDC) ของ market
+    จะตัด level ที่ไกลราคาตลาดที่สุดออกก่อน (level ใกล้ราคาตลาดถูกเก็บไว้) จนเหลือจำนวนมากที่สุด
+    ที่ทุก level ผ่านขั้นต่ำ โดย notional ทั้งหมดกระจายให้ levels ที่เหลือตาม weight
+    """
+    price_scale = 10 ** price_decimals
+    size_scale = 10 ** size_decimals
+
+    levels = grid_prices(current_price, lower_price, upper_price, grid_count,
+                         spacing, volatility, vol_multiplier,
+                         min_step=np.log1p(1 / (current_price * price_scale)))
+
+    # Snap เข้า tick ด้วย integer math (ไม่ต้องแปลง float -> string ทีละ order)
+    current_int = current_price * price_scale
+    level_ints = np.rint(levels * price_scale).astype(np.int64)
+    weights = size_weights(np.abs(level_ints - current_int), sizing, skew)
+
+    # levels ที่ตก tick เดียวกันรวมเป็น level เดียว (รวม weight ด้วย) และตัด tick ที่ราคาตลาดพอดี
+    price_ints, inverse = np.unique(level_ints, return_inverse=True)
+    weights = np.bincount(inverse.ravel(), weights=weights)
+    keep = price_ints != np.rint(current_int)
+    price_ints, weights = price_ints[keep], weights[keep]
+    if not price_ints.size:
+        raise ValueError("Grid range is narrower than one tick")
+
+    # เรียง level ที่ใกล้ราคาตลาดก่อน
+    order = np.argsort(np.abs(price_ints - current_int), kind='stable')
+    price_ints, weights = price_ints[order], weights[order] / weights.sum()
+    prices = price_ints / price_scale
+
+    # ขนาดขั้นต่ำต่อ level (integer) ตาม min_base_amount และ min_quote_amount ของ market
+    min_sizes = np.maximum(
+        np.ceil(min_base_amount * size_scale - 1e-9),
+        np.ceil(min_quote_amount / prices * size_scale - 1e-9)
+    )
+    min_sizes = np.maximum(min_sizes, 1).astype(np.int64)
+
+    # เก็บ k level แรก (ใกล้ราคาตลาดที่สุด) โดย level i ผ่านขั้นต่ำเมื่อ
+    # notional * w_i / sum(w[:k]) / p_i * size_scale >= min_i  <=>  sum(w[:k]) <= capacity_i
+    # sum(w[:k]) เพิ่มขึ้น และ min(capacity[:k]) ลดลงตาม k -> k ที่มากที่สุดหาได้ใน pass เดียว
+    capacity = notional * weights * size_scale / (prices * min_sizes)
+    fits = np.cumsum(weights) <= np.minimum.accumulate(capacity) * (1 + 1e-12)
+    count = int(np.argmin(fits)) if not fits.all() else fits.size
+
+    # กันกรณี floor ปัดลงที่ขอบพอดี
+    while count:
+        base_amounts = np.floor(notional * weights[:count] / weights[:count].sum()
+                                / prices[:count] * size_scale).astype(np.int64)
+        if np.all(base_amounts >= min_sizes[:count]):
+            break
+        count -= 1
+    if not count:
+        raise ValueError("Order size is below the market minimum even for a single grid level - "
+                         "increase investment")
+
+    return {
+        'prices': prices[:count],
+        'price_ints': price_ints[:count],
+        'base_amounts': base_amounts,
+        'is_ask': prices[:count] > current_price,
+        'merged': grid_count - price_ints.size,
+        'dropped': price_ints.size - count,
+    }
@@ -4,15 +4,30 @@ Supports: Long, Neutral, Short strategies (Binance-style)
 Features: Auto-refill, Profit tracking, Real-time monitoring
 """
 import asyncio
+import importlib
 import os
 import signal
+import time
 from datetime import datetime
 from dotenv import load_dotenv
-import lighter
-import requests
 
 load_dotenv()
 
+# lighter / requests / grid (numpy) import ช้า (lighter โหลด signer binary + API models)
+# จึง import แบบ lazy ผ่าน _lazy_import() ตอน init แทนการ import ตอนเริ่มไฟล์
+lighter = None
+requests = None
+grid = None
+
+
+def _lazy_import(name):
+    """Import module ครั้งแรกที่ใช้ แล้ว cache ไว้เป็น global ของไฟล์นี้"""
+    module = globals().get(name)
+    if module is None:
+        module = importlib.import_module(name)
+        globals()[name] = module
+    return module
+
 class GridTradingBot:
     # Market symbols สำหรับแสดงผล
     MARKETS = {
@@ -30,6 +45,10 @@ class GridTradingBot:
         self.grid_count = int(os.getenv('GRID_COUNT', 20))
         self.investment = float(os.getenv('INVESTMENT_USDC', 100))
         self.direction = os.getenv('DIRECTION', 'LONG').upper()  # LONG, NEUTRAL, SHORT
+        self.grid_spacing = os.getenv('GRID_SPACING', 'arithmetic').lower()  # arithmetic, geometric, volatility
+        self.grid_sizing = os.getenv('GRID_SIZING', 'uniform').lower()  # uniform, linear, exponential
+        self.size_skew = float(os.getenv('GRID_SIZE_SKEW', 1.0))
+        self.vol_multiplier = float(os.getenv('GRID_VOL_MULTIPLIER', 1.0))
         self.client = None
         self.order_index = 30000
         self.market_symbol = self.MARKETS.get(self.market_index, f"Market{self.market_index}")
@@ -42,7 +61,29 @@ class GridTradingBot:
         self.trades_count = 0
         self.total_volume = 0.0  # Track total trading volume
 
-    async def init(self):
+        # Startup tracking
+        self.market_info = {}  # metadata ของ market จาก /api/v1/orderBooks
+        self.startup_price = None  # (current_price, best_bid, best_ask) ที่ดึงตอน init
+        self.startup_timings = {}  # {step: seconds}
+        self.startup_begin = None
+        self.price_decimals = 1  # อัปเดตจาก market_info ตอน init
+        self.size_decimals = 8
+        self.volatility = 0.0  # volatility ของ log returns (1m candles) สำหรับ GRID_SPACING=volatility
+
+    async def _timed(self, step, coro):
+        """รัน coroutine แล้วบันทึกเวลาที่ใช้ลงใน startup_timings"""
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.startup_timings[step] = time.perf_counter() - started
+
+    async def connect_client(self):
+        """Import lighter, สร้าง SignerClient และ check_client"""
+        # import (ส่วนที่ช้าที่สุด) และ check_client เป็น blocking - รันใน thread
+        await asyncio.to_thread(_lazy_import, 'lighter')
+
+        # assign ทันที เพื่อให้ run() ปิด client ได้แม้ขั้นตอนอื่นใน init จะ error
         self.client = lighter.SignerClient(
             url=self.base_url,
             private_key=self.api_key_pk,
@@ -50,17 +91,88 @@ class GridTradingBot:
             api_key_index=self.api_key_index
         )
 
-        err = self.client.check_client()
+        return await asyncio.to_thread(self.client.check_client)
+
+    async def load_market_info(self):
+        """โหลด metadata ของ market (decimals, min amounts) - ไม่ critical ถ้าโหลดไม่ได้"""
+        _lazy_import('requests')
+        try:
+            url = f"{self.base_url}/api/v1/orderBooks"
+            response = await asyncio.to_thread(requests.get, url, timeout=5)
+            data = response.json()
+
+            for book in data.get('order_books', []):
+                if book.get('market_id') == self.market_index:
+                    return book
+        except Exception as e:
+            print(f"   ⚠️  Market info error: {e}")
+        return {}
+
+    async def load_volatility(self, count=60):
+        """Volatility ของ log returns จาก 1m candles ล่าสุด (0.0 ถ้าโหลดไม่ได้)"""
+        if self.grid_spacing != 'volatility':
+            return 0.0
+
+        _lazy_import('requests')
+        try:
+            end = int(time.time() * 1000)
+            url = (f"{self.base_url}/api/v1/candlesticks?market_id={self.market_index}&resolution=1m"
+                   f"&start_timestamp={end - count * 60_000}&end_timestamp={end}&count_back={count}")
+            response = await asyncio.to_thread(requests.get, url, timeout=5)
+            data = response.json()
+            await asyncio.to_thread(_lazy_import, 'grid')
+            return grid.recent_volatility([float(c['close']) for c in data.get('candlesticks', [])])
+        except Exception as e:
+            print(f"   ⚠️  Volatility error: {e}")
+        return 0.0
+
+    async def init(self):
+        """
+        เชื่อมต่อ Lighter แบบขนาน:
+        - import lighter + SignerClient + check_client (thread)
+        - ดึง market metadata
+        - ดึงราคาปัจจุบัน
+        - ดึง volatility ล่าสุด (เฉพาะ GRID_SPACING=volatility)
+        - import grid (numpy) ใน thread
+        """
+        init_begin = time.perf_counter()
+
+        # return_exceptions: รอให้ทุกขั้นตอนจบก่อน (client ถูก assign แล้ว) ค่อย raise
+        results = await asyncio.gather(
+            self._timed('client', self.connect_client()),
+            self._timed('market_info', self.load_market_info()),
+            self._timed('price', self.get_current_price()),
+            self._timed('volatility', self.load_volatility()),
+            self._timed('grid_import', asyncio.to_thread(_lazy_import, 'grid')),
+            return_exceptions=True
+        )
+        self.startup_timings['init'] = time.perf_counter() - init_begin
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        err, self.market_info, self.startup_price, self.volatility, _ = results
+
+        self.price_decimals = int(self.market_info.get('supported_price_decimals', self.price_decimals))
+        self.size_decimals = int(self.market_info.get('supported_size_decimals', self.size_decimals))
+
         if err:
             raise Exception(f"Client error: {err}")
 
         print(f"✅ Connected to Lighter")
         print(f"   Account: {self.account_index}")
 
+    def print_startup_timings(self):
+        """แสดงเวลาที่ใช้ในแต่ละขั้นตอนตอนเริ่มบอท"""
+        print(f"\n⏱️  Startup Timings:")
+        for step, seconds in self.startup_timings.items():
+            print(f"   {step:<14} {seconds * 1000:8.0f} ms")
+
     async def get_current_price(self):
         """Get current price from order book"""
+        _lazy_import('requests')
         url = f"{self.base_url}/api/v1/orderBookOrders?market_id={self.market_index}&limit=1"
-        response = requests.get(url)
+        response = await asyncio.to_thread(requests.get, url, timeout=5)
         data = response.json()
 
         best_bid = data['bids'][0]['price']
@@ -71,7 +183,12 @@ class GridTradingBot:
 
     async def calculate_grid_levels(self):
         """Calculate grid price levels based on direction"""
-        current_price, best_bid, best_ask = await self.get_current_price()
+        # ใช้ราคาที่ดึงไว้ตอน init (ถ้ามี) เพื่อไม่ต้องยิง request ซ้ำตอนเริ่มบอท
+        if self.startup_price is not None:
+            current_price, best_bid, best_ask = self.startup_price
+            self.startup_price = None
+        else:
+            current_price, best_bid, best_ask = await self.get_current_price()
 
         # Lighter มี price validation เข้มงวด - ใช้ ±0.5% only
         if self.direction == 'LONG':
@@ -87,25 +204,44 @@ class GridTradingBot:
             self.lower_price = current_price * 0.998  # -0.2%
             self.upper_price = current_price * 1.002  # +0.2%
 
-        spacing = (self.upper_price - self.lower_price) / (self.grid_count - 1)
-        grid_levels = [self.lower_price + (i * spacing) for i in range(self.grid_count)]
+        _lazy_import('grid')
+        grid_build_begin = time.perf_counter()
+        grid_levels = grid.build_grid(
+            current_price, self.lower_price, self.upper_price, self.grid_count,
+            notional=self.investment * self.leverage,
+            price_decimals=self.price_decimals,
+            size_decimals=self.size_decimals,
+            spacing=self.grid_spacing,
+            sizing=self.grid_sizing,
+            skew=self.size_skew,
+            volatility=self.volatility,
+            vol_multiplier=self.vol_multiplier,
+            min_base_amount=float(self.market_info.get('min_base_amount') or 0),
+            min_quote_amount=float(self.market_info.get('min_quote_amount') or 0)
+        )
+        self.startup_timings['grid_build'] = time.perf_counter() - grid_build_begin
 
         print(f"\n📊 Grid Setup ({self.direction}):")
         print(f"   {self.market_symbol} Price: ${current_price:,.2f}")
         print(f"   Best Bid: ${best_bid}")
         print(f"   Best Ask: ${best_ask}")
         print(f"   Range: ${self.lower_price:,.2f} - ${self.upper_price:,.2f}")
-        print(f"   Grids: {self.grid_count}")
-        print(f"   Spacing: ${spacing:.4f}")
+        print(f"   Grids: {len(grid_levels['prices'])} / {self.grid_count}")
+        if grid_levels['merged']:
+            print(f"   ⚠️  {grid_levels['merged']} levels merged (same tick) - ลด GRID_COUNT หรือขยาย range")
+        if grid_levels['dropped']:
+            print(f"   ⚠️  {grid_levels['dropped']} outer levels dropped (below market minimum order size) "
+                  f"- เพิ่ม INVESTMENT_USDC หรือลด GRID_COUNT")
+        print(f"   Spacing: {self.grid_spacing} | Sizing: {self.grid_sizing}")
+        if self.grid_spacing == 'volatility':
+            print(f"   Volatility (1m): {self.volatility * 100:.4f}%")
         print(f"   💡 Mode: {'HIGH FREQUENCY (Volume focus)' if self.direction == 'NEUTRAL' else 'Standard'}")
 
         return grid_levels, current_price
 
     def price_to_int(self, price_float):
-        """แปลง price เป็น int (ลบจุดทศนิยม)"""
-        price_str = f"{price_float:.1f}"
-        price_int = int(price_str.replace(".", ""))
-        return price_int
+        """แปลง price เป็น int ตาม price_decimals ของ market (ปัดเข้า tick)"""
+        return int(round(price_float * 10 ** self.price_decimals))
 
     async def place_initial_position(self, current_price):
         """
@@ -122,7 +258,7 @@ class GridTradingBot:
 
         # คำนวณขนาด position
         coin_amount = (self.investment * self.leverage * initial_percent) / current_price
-        base_amount = int(coin_amount * 1e8)
+        base_amount = int(coin_amount * 10 ** self.size_decimals)
 
         # NEUTRAL และ LONG = BUY, SHORT = SELL
         is_ask = (self.direction == 'SHORT')
@@ -158,8 +294,9 @@ class GridTradingBot:
                 print(f"   ⚠️  {err}")
                 return False
             else:
+                # IOC execute หรือ cancel ทันที และ grid เป็น POST_ONLY คนละราคา
+                # จึงไม่ต้องรอ - วาง grid ต่อได้เลย
                 print(f"   ✅ Position opened!")
-                await asyncio.sleep(2)  # รอให้ order execute
                 return True
 
         except Exception as e:
@@ -168,20 +305,22 @@ class GridTradingBot:
 
     async def place_grid_orders(self, grid_levels, current_price):
         """วาง grid limit orders และบันทึกใน grid_orders"""
-        coin_per_order = (self.investment / self.grid_count * self.leverage) / current_price
-        base_amount = int(coin_per_order * 1e8)
+        base_amounts = grid_levels['base_amounts']
+        size_scale = 10 ** self.size_decimals
 
         orders_placed = {'buy': 0, 'sell': 0}
 
         print(f"\n📝 Placing Grid Orders:")
-        print(f"   Amount per order: {coin_per_order:.8f} {self.market_symbol}")
-        print(f"   Base amount: {base_amount}\n")
+        print(f"   Amount per order: {base_amounts.min() / size_scale:.8f} - "
+              f"{base_amounts.max() / size_scale:.8f} {self.market_symbol}")
+        print(f"   Base amount: {base_amounts.min()} - {base_amounts.max()}\n")
 
-        for i, price in enumerate(grid_levels, 1):
-            # วาง orders ทุกระดับ ไม่ skip (เพื่อ Balance เต็มที่)
-            is_ask = price > current_price
-            price_int = self.price_to_int(price)
+        # grid เรียง level ที่ใกล้ราคาตลาดก่อน ให้มี quote ใน book เร็วที่สุด
+        levels = zip(grid_levels['prices'].tolist(), grid_levels['price_ints'].tolist(),
+                     base_amounts.tolist(), grid_levels['is_ask'].tolist())
 
+        for i, (price, price_int, base_amount, is_ask) in enumerate(levels, 1):
+            # วาง orders ทุกระดับ ไม่ skip (เพื่อ Balance เต็มที่)
             try:
                 tx, tx_hash, err = await self.client.create_order(
                     market_index=self.market_index,
@@ -204,6 +343,8 @@ class GridTradingBot:
                         'price_int': price_int
                     }
                     orders_placed['sell' if is_ask else 'buy'] += 1
+                    if self.startup_begin and 'first_quote' not in self.startup_timings:
+                        self.startup_timings['first_quote'] = time.perf_counter() - self.startup_begin
                     if i % 5 == 0 or i <= 3:
                         print(f"   ✓ {'SELL' if is_ask else 'BUY'} @ ${price:,.2f}")
                 else:
@@ -235,7 +376,7 @@ class GridTradingBot:
             # Call API
             url = f"{self.base_url}/api/v1/accountActiveOrders?account_index={self.account_index}&market_id={self.market_index}"
             headers = {"Authorization": auth_token}
-            response = requests.get(url, headers=headers)
+            response = await asyncio.to_thread(requests.get, url, headers=headers, timeout=5)
             data = response.json()
 
             if 'orders' in data:
@@ -258,18 +399,14 @@ class GridTradingBot:
             try:
                 # ดู active orders
                 active_orders = await self.get_active_orders()
-                active_prices = set()
 
-                for order in active_orders:
-                    price_str = order.get('price', '0')
-                    # แปลง price กลับเป็น float
-                    price_float = float(price_str) / (10 ** len(price_str.split('.')[0]))
-                    active_prices.add(round(price_float, 1))
+                # แปลง price กลับเป็น integer tick (price_decimals เดียวกับตอนวาง order)
+                active_ticks = {self.price_to_int(float(order.get('price', '0'))) for order in active_orders}
 
                 # เช็คว่า grid order ไหนถูก fill (หายไปจาก active orders)
                 filled_prices = []
-                for grid_price in list(self.grid_orders.keys()):
-                    if grid_price not in active_prices:
+                for grid_price, order_info in list(self.grid_orders.items()):
+                    if order_info['price_int'] not in active_ticks:
                         filled_prices.append(grid_price)
 
                 # Refill orders ที่ถูก fill
@@ -278,7 +415,7 @@ class GridTradingBot:
                     was_ask = order_info['is_ask']
 
                     # Calculate volume
-                    coin_amount = order_info['base_amount'] / 1e8
+                    coin_amount = order_info['base_amount'] / 10 ** self.size_decimals
                     volume_usd = coin_amount * price
                     self.total_volume += volume_usd
                     self.trades_count += 1
@@ -364,15 +501,19 @@ class GridTradingBot:
             print(f"Market: {self.market_symbol} | Direction: {self.direction}")
             print(f"Leverage: {self.leverage}x | Grids: {self.grid_count}")
 
+            self.startup_begin = time.perf_counter()
+
             await self.init()
 
             grid_levels, current_price = await self.calculate_grid_levels()
 
             # เปิด initial position (Binance-style)
-            await self.place_initial_position(current_price)
+            await self._timed('initial_order', self.place_initial_position(current_price))
 
             # วาง grid orders
-            await self.place_grid_orders(grid_levels, current_price)
+            await self._timed('grid_orders', self.place_grid_orders(grid_levels, current_price))
+            self.startup_timings['total'] = time.perf_counter() - self.startup_begin
+            self.print_startup_timings()
 
             print(f"\n{'='*60}")
             print("✅ Grid Bot Setup Complete!")